@@ -237,7 +237,7 @@ def init(
 
 @cli.command()
 @click.option(
-    "--path", type=Path, default=Path.cwd(), help="Project directory (default: current)"
+    "--path", type=Path, default=Path.cwd, help="Project directory (default: current)"
 )
 def update(path: Path):
     """Regenerate all files from config (cm.yaml)."""
@@ -321,7 +321,7 @@ def cache():
 
 @cache.command("clear")
 @click.option(
-    "--path", type=Path, default=Path.cwd(), help="Project directory (default: current)"
+    "--path", type=Path, default=Path.cwd, help="Project directory (default: current)"
 )
 def cache_clear(path: Path):
     """Clear all cached assets."""
@@ -337,7 +337,7 @@ def cache_clear(path: Path):
 
 @cache.command("list")
 @click.option(
-    "--path", type=Path, default=Path.cwd(), help="Project directory (default: current)"
+    "--path", type=Path, default=Path.cwd, help="Project directory (default: current)"
 )
 def cache_list(path: Path):
     """List all cached assets."""
@@ -358,7 +358,7 @@ def cache_list(path: Path):
 
 @cache.command("path")
 @click.option(
-    "--path", type=Path, default=Path.cwd(), help="Project directory (default: current)"
+    "--path", type=Path, default=Path.cwd, help="Project directory (default: current)"
 )
 def cache_path(path: Path):
     """Show cache directory path."""
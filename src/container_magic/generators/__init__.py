@@ -1 +1,31 @@
 """Generators for Dockerfiles, build scripts, and run scripts."""
+
+import os
+from pathlib import Path
+
+from jinja2 import Environment, PackageLoader
+
+# Built once per process; the environment caches the compiled templates.
+# Packaged templates don't change at runtime, so skip the reload check.
+_ENV = Environment(
+    loader=PackageLoader("container_magic", "templates"),
+    keep_trailing_newline=True,
+    auto_reload=False,
+)
+
+
+def _write_executable(path: Path, content: str) -> None:
+    """Write a generated script and make it executable (mode 0o755).
+
+    A new file is created with the mode, so it is only changed afterwards
+    when the file already existed with another mode or the umask stripped
+    bits. os.fchmod is missing on Windows, where the path is chmodded.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755)
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+        if os.fstat(fd).st_mode & 0o777 != 0o755:
+            if hasattr(os, "fchmod"):
+                os.fchmod(fd, 0o755)
+            else:
+                path.chmod(0o755)
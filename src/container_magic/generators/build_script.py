@@ -3,10 +3,9 @@
 
 from pathlib import Path
 
-from jinja2 import Environment, PackageLoader
-
 from container_magic.core.config import ContainerMagicConfig
 from container_magic.core.symlinks import scan_workspace_symlinks
+from container_magic.generators import _ENV, _write_executable
 
 
 def generate_build_script(
@@ -19,11 +18,7 @@ def generate_build_script(
         project_dir: Path to project directory
         workspace_symlinks: Pre-scanned symlinks (avoids redundant scan)
     """
-    env = Environment(
-        loader=PackageLoader("container_magic", "templates"),
-        keep_trailing_newline=True,
-    )
-    template = env.get_template("build.sh.j2")
+    template = _ENV.get_template("build.sh.j2")
 
     # Get default target from config (defaults to "production")
     default_target = config.build_script.default_target
@@ -52,6 +47,4 @@ def generate_build_script(
         workspace_symlinks=workspace_symlinks,
     )
 
-    build_script = project_dir / "build.sh"
-    build_script.write_text(content)
-    build_script.chmod(0o755)
+    _write_executable(project_dir / "build.sh", content)
@@ -3,7 +3,7 @@
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
-from jinja2 import Environment, PackageLoader, select_autoescape
+from jinja2 import select_autoescape
 
 from container_magic.core.cache import build_asset_map
 from container_magic.core.config import (
@@ -20,6 +20,15 @@ from container_magic.core.templates import (
     resolve_distro,
     resolve_inherited_distro,
 )
+from container_magic.generators import _ENV
+
+# The Dockerfile template relies on block whitespace trimming, which would
+# change the shell script output, so it uses an overlay of the shared env
+_DOCKERFILE_ENV = _ENV.overlay(
+    autoescape=select_autoescape(),
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
 
 
 def _step_is_become(step: Union[str, Dict[str, Any]]) -> Optional[str]:
@@ -341,15 +350,7 @@ def generate_dockerfile(
     config: ContainerMagicConfig, output_path: Path, workspace_symlinks=None
 ) -> None:
     """Generate Dockerfile from configuration."""
-    env = Environment(
-        loader=PackageLoader("container_magic", "templates"),
-        autoescape=select_autoescape(),
-        trim_blocks=True,
-        lstrip_blocks=True,
-        keep_trailing_newline=True,
-    )
-
-    template = env.get_template("Dockerfile.j2")
+    template = _DOCKERFILE_ENV.get_template("Dockerfile.j2")
 
     # Build stages dict with defaults if needed
     stages = dict(config.stages)
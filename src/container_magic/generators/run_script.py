@@ -3,8 +3,6 @@
 
 from pathlib import Path
 
-from jinja2 import Environment, PackageLoader
-
 from container_magic.core.config import ContainerMagicConfig
 from container_magic.core.runner import build_feature_flags
 from container_magic.core.templates import (
@@ -17,6 +15,7 @@ from container_magic.core.volumes import (
     label_volumes,
     shorthand_anchored_paths,
 )
+from container_magic.generators import _ENV, _write_executable
 
 
 def generate_run_script(config: ContainerMagicConfig, project_dir: Path) -> None:
@@ -26,11 +25,7 @@ def generate_run_script(config: ContainerMagicConfig, project_dir: Path) -> None
         config: Configuration object
         project_dir: Path to project directory
     """
-    env = Environment(
-        loader=PackageLoader("container_magic", "templates"),
-        keep_trailing_newline=True,
-    )
-    template = env.get_template("run.sh.j2")
+    template = _ENV.get_template("run.sh.j2")
 
     # Determine runtime backend
     backend = config.backend
@@ -89,6 +84,4 @@ def generate_run_script(config: ContainerMagicConfig, project_dir: Path) -> None
         ipc=effective_rt.ipc,
     )
 
-    run_script = project_dir / "run.sh"
-    run_script.write_text(content)
-    run_script.chmod(0o755)
+    _write_executable(project_dir / "run.sh", content)
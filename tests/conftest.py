@@ -0,0 +1,31 @@
+"""Command line options shared by the whole test suite."""
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--skip-unchanged",
+        action="store_true",
+        default=False,
+        help=(
+            "skip config fixture tests that passed on a previous run with the "
+            "same fixture and generator source (needs the cache provider)"
+        ),
+    )
+    parser.addoption(
+        "--run-slow",
+        action="store_true",
+        default=False,
+        help="run tests marked slow, which are skipped by default",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked slow unless --run-slow was given."""
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="slow test (pass --run-slow to run)")
+    for item in items:
+        if item.get_closest_marker("slow"):
+            item.add_marker(skip_slow)
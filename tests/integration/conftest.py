@@ -14,20 +14,177 @@ Two base images are built once per test session:
 This naming convention is deliberately inconsistent to cover both code paths.
 """
 
+import hashlib
+import os
 import shutil
 import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import pytest
 
+import container_magic
+from tests.utils.cli import run_cm
+from tests.utils.container import build_image
 
-def _has_container_runtime():
-    return shutil.which("docker") or shutil.which("podman")
+_BASE_IMAGE_FIXTURES = {"debian_base_image", "alpine_base_image"}
 
+# Container runtime found on PATH at startup, or None
+_RUNTIME_KEY = pytest.StashKey[Optional[str]]()
 
-def _runtime():
+# Images the base image fixtures build from. They are pulled concurrently in
+# the background once collection selects tests that need them.
+_PULL_IMAGES = ("debian:bookworm-slim", "alpine:latest")
+_PULLS_KEY = pytest.StashKey[List[subprocess.Popen]]()
+
+
+def pytest_configure(config):
+    """Detect the container runtime once, preferring docker like build.sh."""
     if shutil.which("docker"):
-        return "docker"
-    return "podman"
+        config.stash[_RUNTIME_KEY] = "docker"
+    elif shutil.which("podman"):
+        config.stash[_RUNTIME_KEY] = "podman"
+    else:
+        config.stash[_RUNTIME_KEY] = None
+
+
+def _runtime_responds(runtime):
+    """Return whether the runtime's daemon answers ``info``."""
+    try:
+        result = subprocess.run(
+            [runtime, "info"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=30,
+        )
+    except subprocess.TimeoutExpired:
+        return False
+    return result.returncode == 0
+
+
+def _uses_base_image(item):
+    return bool(_BASE_IMAGE_FIXTURES & set(item.fixturenames))
+
+
+def _needs_runtime(item):
+    return _uses_base_image(item) or item.get_closest_marker("docker") is not None
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    """Group the tests that need a container runtime and run them first.
+
+    Every test that shares a base image is pinned to one xdist worker. The
+    base images are session fixtures with a fixed tag, so each worker would
+    otherwise build its own copy and remove it on teardown while another
+    worker may still be using it. Under ``--dist loadgroup`` the docker_build
+    group keeps them, and the container-building tests, together. The marker
+    has to be in place before xdist reads it, hence tryfirst.
+
+    With a runtime installed these tests are moved to the front, so under
+    pytest-xdist the long builds start first and the quick generation tests
+    fill in the remaining workers.
+    """
+    for item in items:
+        if _uses_base_image(item):
+            item.add_marker(pytest.mark.xdist_group("docker_build"))
+
+    if config.stash[_RUNTIME_KEY] is not None:
+        # Stable sort, so the order within each half is unchanged
+        items.sort(key=lambda item: not _needs_runtime(item))
+
+
+def pytest_collection_finish(session):
+    """Skip or prepare the selected tests that need a container runtime.
+
+    This runs after -k and -m deselection, so the daemon is only pinged, and
+    the base images only pulled, when a test that will run needs them.
+    Without a runtime, or when its daemon does not respond, these tests are
+    skipped here, before any of their fixtures are set up. Otherwise the base
+    images start pulling in parallel. A failed pull is ignored; the build
+    pulls again and reports it.
+    """
+    config = session.config
+    if config.option.collectonly:
+        return
+    # Tests already skipped, e.g. slow ones without --run-slow, need nothing
+    needs_runtime = [
+        item
+        for item in session.items
+        if _needs_runtime(item) and item.get_closest_marker("skip") is None
+    ]
+    if not needs_runtime:
+        return
+
+    runtime = config.stash[_RUNTIME_KEY]
+    if runtime is None:
+        skip_reason = "No container runtime available"
+    elif not _runtime_responds(runtime):
+        skip_reason = f"{runtime} is installed but not responding"
+        config.stash[_RUNTIME_KEY] = None
+    else:
+        skip_reason = None
+    if skip_reason is not None:
+        skip_no_runtime = pytest.mark.skip(reason=skip_reason)
+        for item in needs_runtime:
+            item.add_marker(skip_no_runtime)
+        return
+
+    # Pulls are shared by the whole host, so only one xdist worker starts them
+    first_worker = os.environ.get("PYTEST_XDIST_WORKER", "gw0") == "gw0"
+    if first_worker and any(_uses_base_image(item) for item in needs_runtime):
+        config.stash[_PULLS_KEY] = [
+            subprocess.Popen(
+                [runtime, "pull", "--quiet", image],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for image in _PULL_IMAGES
+        ]
+
+
+def pytest_unconfigure(config):
+    """Stop any base image pulls that are still running."""
+    for process in config.stash.get(_PULLS_KEY, []):
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+
+# pytest cache entry mapping node ids to the input digest they last passed with
+_PASSED_CACHE_KEY = "container-magic/passed"
+
+# Input digest a skip_if_unchanged test recorded, for pytest_runtest_makereport
+_DIGEST_KEY = pytest.StashKey[str]()
+
+# Digests of the tests that passed this session, saved at session end
+_NEW_PASSES_KEY = pytest.StashKey[Dict[str, str]]()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Record the input digest of tests that used skip_if_unchanged and passed."""
+    outcome = yield
+    report = outcome.get_result()
+    digest = item.stash.get(_DIGEST_KEY, None)
+    if digest is None or report.when != "call" or not report.passed:
+        return
+    item.config.stash.setdefault(_NEW_PASSES_KEY, {})[item.nodeid] = digest
+
+
+def pytest_sessionfinish(session):
+    """Save the digests of this session's passes in one cache write.
+
+    The stored entries are read again first, so passes that other xdist
+    workers saved meanwhile are kept.
+    """
+    new_passes = session.config.stash.get(_NEW_PASSES_KEY, None)
+    if not new_passes:
+        return
+    cache = session.config.cache
+    passed = cache.get(_PASSED_CACHE_KEY, {})
+    passed.update(new_passes)
+    cache.set(_PASSED_CACHE_KEY, passed)
 
 
 def _build_base_image(tmp_path_factory, config_yaml, image_tag, label):
@@ -36,25 +193,14 @@ def _build_base_image(tmp_path_factory, config_yaml, image_tag, label):
     (project / "workspace").mkdir()
     (project / "cm.yaml").write_text(config_yaml)
 
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=project,
-        capture_output=True,
-        text=True,
-    )
+    result = run_cm(["update"], cwd=project)
     assert result.returncode == 0, f"cm update failed for {label}:\n{result.stderr}"
 
     # Extract tag from image_tag (e.g. "cm-test:debian" -> "debian")
     tag = image_tag.split(":")[1]
-    result = subprocess.run(
-        ["./build.sh", "--tag", tag],
-        cwd=project,
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
+    result = build_image(project, tag=tag)
     assert result.returncode == 0, (
-        f"build.sh failed for {label}:\nstdout: {result.stdout}\nstderr: {result.stderr}"
+        f"Image build failed for {label}:\n{result.stderr.decode(errors='replace')}"
     )
     return project
 
@@ -111,26 +257,108 @@ stages:
 
 
 @pytest.fixture(scope="session")
-def debian_base_image(tmp_path_factory):
+def container_runtime(pytestconfig):
+    """Name of the container runtime detected at startup, or None."""
+    return pytestconfig.stash[_RUNTIME_KEY]
+
+
+@pytest.fixture(scope="session")
+def debian_base_image(tmp_path_factory, container_runtime):
     """Build cm-test:debian from debian:bookworm-slim with Python installed."""
-    if not _has_container_runtime():
+    if container_runtime is None:
         pytest.skip("No container runtime available")
     _build_base_image(tmp_path_factory, DEBIAN_CONFIG, "cm-test:debian", "debian-base")
     yield "cm-test:debian"
     subprocess.run(
-        [_runtime(), "rmi", "-f", "cm-test:debian"],
-        capture_output=True,
+        [container_runtime, "rmi", "-f", "cm-test:debian"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
     )
 
 
 @pytest.fixture(scope="session")
-def alpine_base_image(tmp_path_factory):
+def alpine_base_image(tmp_path_factory, container_runtime):
     """Build cm-test:apk from alpine:latest with Python installed."""
-    if not _has_container_runtime():
+    if container_runtime is None:
         pytest.skip("No container runtime available")
     _build_base_image(tmp_path_factory, ALPINE_CONFIG, "cm-test:apk", "alpine-base")
     yield "cm-test:apk"
     subprocess.run(
-        [_runtime(), "rmi", "-f", "cm-test:apk"],
-        capture_output=True,
+        [container_runtime, "rmi", "-f", "cm-test:apk"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
     )
+
+
+@pytest.fixture(scope="session")
+def initialized_project(tmp_path_factory):
+    """Return a factory that runs ``cm init --here <template>`` once per template.
+
+    Read-only tests share these projects instead of each regenerating the
+    same files. The factory returns (project_dir, result). Projects are shared
+    across the session, so tests must treat them as read-only and copy them to
+    mutate.
+    """
+    projects = {}
+
+    def _init(template):
+        if template not in projects:
+            project_dir = tmp_path_factory.mktemp("test-project")
+            result = run_cm(["init", "--here", template], cwd=project_dir)
+            projects[template] = (project_dir, result)
+        return projects[template]
+
+    return _init
+
+
+@pytest.fixture(scope="session")
+def linters():
+    """Look up the optional linters on PATH once per session.
+
+    Maps each linter name to its path, or None when it is not installed.
+    """
+    return {
+        name: shutil.which(name)
+        for name in ("hadolint", "shellcheck", "shfmt", "yamlfmt")
+    }
+
+
+@pytest.fixture(scope="session")
+def generator_digest():
+    """Digest of the installed container_magic sources and templates."""
+    package_dir = Path(container_magic.__file__).parent
+    digest = hashlib.sha256()
+    for path in sorted(package_dir.rglob("*")):
+        if path.is_file() and "__pycache__" not in path.parts:
+            digest.update(str(path.relative_to(package_dir)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@pytest.fixture
+def skip_if_unchanged(request, generator_digest):
+    """Return a function that skips the test if its inputs are unchanged.
+
+    This is how a test opts into --skip-unchanged. Call it with the content
+    of the test's inputs, as bytes. With --skip-unchanged, the test is
+    skipped when it passed on a previous run with the same inputs and
+    generator source. Otherwise the digest is only recorded on a pass.
+    """
+    config = request.config
+    cache = getattr(config, "cache", None)
+
+    def _skip_if_unchanged(*contents):
+        if cache is None:
+            return
+        digest = hashlib.sha256(generator_digest.encode())
+        for content in contents:
+            digest.update(content)
+        request.node.stash[_DIGEST_KEY] = digest.hexdigest()
+
+        if not config.getoption("--skip-unchanged"):
+            return
+        passed = cache.get(_PASSED_CACHE_KEY, {})
+        if passed.get(request.node.nodeid) == request.node.stash[_DIGEST_KEY]:
+            pytest.skip("unchanged since last pass (--skip-unchanged)")
+
+    return _skip_if_unchanged
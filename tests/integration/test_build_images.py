@@ -1,8 +1,8 @@
 """Integration tests that actually build Docker images against representative base images.
 
 Catches structural bugs (like incorrect adduser syntax on Alpine) that only
-surface at build time. Marked @pytest.mark.slow so they can be excluded with:
-    pytest -m "not slow"
+surface at build time. Marked @pytest.mark.slow, so they only run with:
+    pytest --run-slow
 """
 
 import shutil
@@ -11,6 +11,9 @@ from pathlib import Path
 
 import pytest
 
+from tests.utils.cli import run_cm
+from tests.utils.container import run_with_early_skip
+
 # Each tuple: (base_image, package_manager, expected_shell)
 BASE_IMAGES = [
     ("alpine:latest", "apk", "/bin/sh"),
@@ -78,25 +81,14 @@ def _setup_and_build(tmp_path_factory, base_image):
     (project / "workspace").mkdir()
     _write_config(project, base_image)
 
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=project,
-        capture_output=True,
-        text=True,
-    )
+    result = run_cm(["update"], cwd=project)
     assert result.returncode == 0, (
         f"cm update failed for {base_image}:\n{result.stderr}"
     )
 
-    result = subprocess.run(
-        ["./build.sh"],
-        cwd=project,
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
+    result = run_with_early_skip(["./build.sh"], project)
     assert result.returncode == 0, (
-        f"Build failed for {base_image}:\nstdout: {result.stdout}\nstderr: {result.stderr}"
+        f"Build failed for {base_image}:\n{result.stderr.decode(errors='replace')}"
     )
     return project
 
@@ -108,7 +100,8 @@ def alpine_project(tmp_path_factory, alpine_base_image):
     yield project
     subprocess.run(
         [_runtime(), "rmi", "-f", f"{_image_name('alpine:latest')}:latest"],
-        capture_output=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
     )
 
 
@@ -119,7 +112,8 @@ def debian_project(tmp_path_factory, debian_base_image):
     yield project
     subprocess.run(
         [_runtime(), "rmi", "-f", f"{_image_name('debian:bookworm-slim')}:latest"],
-        capture_output=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
     )
 
 
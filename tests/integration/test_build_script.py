@@ -9,6 +9,9 @@ import pytest
 from container_magic.core.config import ContainerMagicConfig
 from container_magic.generators.build_script import generate_build_script
 
+# Text build.sh --help must show
+HELP_TEXT = ("Usage:", "--tag", "--uid", "--gid")
+
 
 @pytest.fixture
 def temp_project_dir():
@@ -76,10 +79,8 @@ def test_build_script_help_output(temp_project_dir):
         check=True,
     )
 
-    assert "Usage:" in result.stdout
-    assert "--tag" in result.stdout
-    assert "--uid" in result.stdout
-    assert "--gid" in result.stdout
+    missing = [text for text in HELP_TEXT if text not in result.stdout]
+    assert not missing, f"build.sh --help missing: {missing}"
 
 
 def test_build_script_tag_override(temp_project_dir):
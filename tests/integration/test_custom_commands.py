@@ -1,33 +1,133 @@
 """Integration tests for custom commands feature."""
 
-import subprocess
+import shutil
 
 import pytest
 
+from tests.utils.cli import run_cm
+from tests.utils.files import reflink_or_copy
+from tests.utils.validation import validate_shell_scripts
+
+DAEMON_ENV_YAML = """
+commands:
+  daemon:
+    command: "python workspace/daemon.py"
+    description: "Run daemon"
+    env:
+      LOG_LEVEL: "debug"
+"""
+
+NO_DESCRIPTION_YAML = """
+commands:
+  serve:
+    command: "python -m http.server 8000"
+"""
+
+WORKSPACE_VARIABLE_YAML = """
+commands:
+  build:
+    command: "$WORKSPACE/scripts/build.sh"
+    description: "Build the project"
+  test:
+    command: "bash -c 'source $WORKSPACE/setup.sh && pytest'"
+    description: "Run tests with setup"
+"""
+
+PORTS_YAML = """
+commands:
+  serve:
+    command: "python -m http.server 8000"
+    description: "Start dev server"
+    ports:
+      - "8000:8000"
+      - "8443:443"
+"""
+
+# (expected run.sh content, what it shows) for test_custom_commands_in_run_sh
+DAEMON_AND_TEST_CHECKS = [
+    ("# Custom command handlers", "custom command handlers section"),
+    ("run_daemon()", "daemon function"),
+    ("# Run the daemon process", "daemon description"),
+    ("python workspace/daemon.py", "daemon command"),
+    ("run_test()", "test function"),
+    ("# Run tests", "test description"),
+    ("pytest workspace/tests", "test command"),
+    ("PYTEST_ARGS", "test env vars"),
+    ('case "$1" in', "case statement"),
+    ("daemon)", "daemon case"),
+    ("test)", "test case"),
+]
+
+# Commands blocks whose run.sh is checked with shellcheck
+SHELLCHECK_VARIANTS = {
+    "daemon_env": DAEMON_ENV_YAML,
+    "no_description": NO_DESCRIPTION_YAML,
+    "workspace_variable": WORKSPACE_VARIABLE_YAML,
+    "ports": PORTS_YAML,
+}
+
 
 @pytest.fixture
-def temp_project_dir(tmp_path):
-    """Create a temporary directory for CLI tests."""
+def temp_project_dir(tmp_path, initialized_project):
+    """Copy a session-wide ``cm init --here python`` project into tmp_path."""
+    template_dir, result = initialized_project("python")
+    assert result.returncode == 0, f"cm init failed: {result.stderr}"
+
     project_dir = tmp_path / "test-project"
-    project_dir.mkdir()
+    shutil.copytree(template_dir, project_dir, copy_function=reflink_or_copy)
     return project_dir
 
 
-def test_custom_commands_in_run_sh(temp_project_dir):
+@pytest.fixture
+def project_with_commands(temp_project_dir):
+    """Return a function that appends commands to cm.yaml and runs cm update.
+
+    Only tests that change the config pay for regenerating the project.
+    """
+
+    def _regenerate(commands_yaml):
+        config_file = temp_project_dir / "cm.yaml"
+        config_file.write_text(config_file.read_text() + commands_yaml)
+        result = run_cm(["update"], cwd=temp_project_dir)
+        assert result.returncode == 0, f"cm update failed: {result.stderr}"
+        return temp_project_dir
+
+    return _regenerate
+
+
+@pytest.fixture(scope="session")
+def shellcheck_results(tmp_path_factory, initialized_project):
+    """Return a function that shellchecks every SHELLCHECK_VARIANTS run.sh.
+
+    On its first call each variant is generated and all of their run.sh
+    files are checked with a single shellcheck call. The results are keyed
+    by variant name.
+    """
+    template_dir, _ = initialized_project("python")
+    results = {}
+
+    def _shellcheck_results():
+        if results:
+            return results
+        scripts = {}
+        for name, commands_yaml in SHELLCHECK_VARIANTS.items():
+            project_dir = tmp_path_factory.mktemp(f"shellcheck-{name}") / "test-project"
+            shutil.copytree(template_dir, project_dir, copy_function=reflink_or_copy)
+            config_file = project_dir / "cm.yaml"
+            config_file.write_text(config_file.read_text() + commands_yaml)
+            result = run_cm(["update"], cwd=project_dir)
+            assert result.returncode == 0, f"cm update failed: {result.stderr}"
+            scripts[name] = project_dir / "run.sh"
+
+        linted = validate_shell_scripts(list(scripts.values()), check_formatting=False)
+        results.update({name: linted[path] for name, path in scripts.items()})
+        return results
+
+    return _shellcheck_results
+
+
+def test_custom_commands_in_run_sh(project_with_commands):
     """Test that custom commands are generated in run.sh."""
-    # Initialize a basic project
-    result = subprocess.run(
-        ["cm", "init", "--here", "python"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm init failed: {result.stderr}"
-
-    # Add custom commands to the config
-    config_file = temp_project_dir / "cm.yaml"
-    config_content = config_file.read_text()
-
     # Add custom commands section
     custom_commands = """
 commands:
@@ -40,91 +140,25 @@ commands:
     env:
       PYTEST_ARGS: "-v"
 """
-    config_file.write_text(config_content + custom_commands)
-
-    # Regenerate files
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm update failed: {result.stderr}"
+    project_dir = project_with_commands(custom_commands)
 
-    # Check run.sh has custom commands
-    run_sh_content = (temp_project_dir / "run.sh").read_text()
-    assert "# Custom command handlers" in run_sh_content, (
-        "run.sh missing custom command handlers section"
-    )
-    assert "run_daemon()" in run_sh_content, "run.sh missing daemon function"
-    assert "# Run the daemon process" in run_sh_content, (
-        "run.sh missing daemon description"
-    )
-    assert "python workspace/daemon.py" in run_sh_content, (
-        "run.sh missing daemon command"
-    )
-    assert "run_test()" in run_sh_content, "run.sh missing test function"
-    assert "# Run tests" in run_sh_content, "run.sh missing test description"
-    assert "pytest workspace/tests" in run_sh_content, "run.sh missing test command"
-    assert "PYTEST_ARGS" in run_sh_content, "run.sh missing test env vars"
-
-    # Check run.sh has case statement to dispatch commands
-    assert 'case "$1" in' in run_sh_content, "run.sh missing case statement"
-    assert "daemon)" in run_sh_content, "run.sh missing daemon case"
-    assert "test)" in run_sh_content, "run.sh missing test case"
-
-
-def test_custom_commands_with_no_description(temp_project_dir):
-    """Test that custom commands work without descriptions."""
-    # Initialize a basic project
-    result = subprocess.run(
-        ["cm", "init", "--here", "python"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm init failed: {result.stderr}"
-
-    # Add custom command without description
-    config_file = temp_project_dir / "cm.yaml"
-    config_content = config_file.read_text()
-
-    custom_commands = """
-commands:
-  serve:
-    command: "python -m http.server 8000"
-"""
-    config_file.write_text(config_content + custom_commands)
-
-    # Regenerate files
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm update failed: {result.stderr}"
-
-    run_sh_content = (temp_project_dir / "run.sh").read_text()
-    assert "run_serve()" in run_sh_content, "run.sh missing serve function"
-    assert "python -m http.server 8000" in run_sh_content, (
-        "run.sh missing serve command"
-    )
+    run_sh_content = (project_dir / "run.sh").read_text()
+    missing = [
+        label
+        for needle, label in DAEMON_AND_TEST_CHECKS
+        if needle not in run_sh_content
+    ]
+    assert not missing, f"run.sh missing: {missing}"
 
 
-def test_no_custom_commands_section_when_empty(temp_project_dir):
+def test_no_custom_commands_section_when_empty(initialized_project):
     """Test that custom command sections are not added when no commands are defined."""
-    # Initialize a basic project (no custom commands)
-    result = subprocess.run(
-        ["cm", "init", "--here", "python"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
+    # The freshly initialised project is only read, so it needs no copy
+    project_dir, result = initialized_project("python")
     assert result.returncode == 0, f"cm init failed: {result.stderr}"
 
     # Check run.sh doesn't have custom command handlers
-    run_sh_content = (temp_project_dir / "run.sh").read_text()
+    run_sh_content = (project_dir / "run.sh").read_text()
     assert "# Custom command handlers" not in run_sh_content, (
         "run.sh should not have custom command handlers when none defined"
     )
@@ -133,50 +167,27 @@ def test_no_custom_commands_section_when_empty(temp_project_dir):
     )
 
 
-def test_custom_commands_use_workdir_not_workspace(temp_project_dir):
+def test_custom_commands_use_workdir_not_workspace(project_with_commands):
     """Test that custom commands use WORKDIR (not WORKDIR/WORKSPACE) as working directory."""
-    # Initialize project
-    result = subprocess.run(
-        ["cm", "init", "--here", "python"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm init failed: {result.stderr}"
-
     # Add custom command
-    config_file = temp_project_dir / "cm.yaml"
-    config_content = config_file.read_text()
-
     custom_commands = """
 commands:
   daemon:
     command: "python workspace/daemon.py"
     description: "Run daemon"
 """
-    config_file.write_text(config_content + custom_commands)
-
-    # Regenerate
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm update failed: {result.stderr}"
+    project_dir = project_with_commands(custom_commands)
 
     # Check run.sh uses WORKDIR (not WORKDIR/WORKSPACE) for custom commands
-    run_sh_content = (temp_project_dir / "run.sh").read_text()
+    run_sh_content = (project_dir / "run.sh").read_text()
 
     # Should use -w "${WORKDIR}" not -w "${WORKDIR}/${WORKSPACE_NAME}" in custom commands
     # Look for the pattern in the run_daemon function
-    import re
-
-    daemon_match = re.search(
-        r"run_daemon\(\).*?^\}", run_sh_content, re.MULTILINE | re.DOTALL
-    )
-    assert daemon_match, "Could not find run_daemon function"
-    daemon_function = daemon_match.group(0)
+    start = run_sh_content.find("run_daemon()")
+    assert start >= 0, "Could not find run_daemon function"
+    end = run_sh_content.find("\n}", start)
+    assert end >= 0, "Could not find end of run_daemon function"
+    daemon_function = run_sh_content[start:end]
 
     assert '-w "${WORKDIR}"' in daemon_function, (
         "Custom command should use WORKDIR as working directory"
@@ -186,142 +197,38 @@ commands:
     )
 
 
-def test_run_sh_shellcheck_validation_with_commands(temp_project_dir):
+@pytest.mark.parametrize(
+    "commands_yaml,expected",
+    [
+        (NO_DESCRIPTION_YAML, ["run_serve()", "python -m http.server 8000"]),
+        (
+            WORKSPACE_VARIABLE_YAML,
+            [r"\$WORKSPACE/scripts/build.sh", r"source \$WORKSPACE/setup.sh"],
+        ),
+        (PORTS_YAML, ['--publish" "8000:8000"', '--publish" "8443:443"']),
+    ],
+    ids=["no_description", "workspace_variable", "ports"],
+)
+def test_custom_commands_variants(project_with_commands, commands_yaml, expected):
+    """Test that each commands variant is rendered into run.sh.
+
+    Covers commands without descriptions, $WORKSPACE escaping and port
+    publishing flags.
+    """
+    project_dir = project_with_commands(commands_yaml)
+
+    run_sh_content = (project_dir / "run.sh").read_text()
+    missing = [needle for needle in expected if needle not in run_sh_content]
+    assert not missing, f"run.sh missing: {missing}"
+
+
+@pytest.mark.parametrize("variant", SHELLCHECK_VARIANTS)
+def test_run_sh_shellcheck_validation_with_commands(
+    linters, shellcheck_results, variant
+):
     """Test that run.sh with custom commands passes shellcheck validation."""
-    import shutil
-
-    if not shutil.which("shellcheck"):
+    if not linters["shellcheck"]:
         pytest.skip("shellcheck not available")
 
-    # Initialize project
-    result = subprocess.run(
-        ["cm", "init", "--here", "python"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm init failed: {result.stderr}"
-
-    # Add custom commands
-    config_file = temp_project_dir / "cm.yaml"
-    config_content = config_file.read_text()
-
-    custom_commands = """
-commands:
-  daemon:
-    command: "python workspace/daemon.py"
-    description: "Run daemon"
-    env:
-      LOG_LEVEL: "debug"
-"""
-    config_file.write_text(config_content + custom_commands)
-
-    # Regenerate
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm update failed: {result.stderr}"
-
-    # Validate with shellcheck
-    run_sh = temp_project_dir / "run.sh"
-    result = subprocess.run(
-        ["shellcheck", str(run_sh)],
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, (
-        f"shellcheck failed for run.sh:\n{result.stdout}\n{result.stderr}"
-    )
-
-
-def test_commands_with_workspace_variable(temp_project_dir):
-    """Test that commands with $WORKSPACE variable expand in container."""
-    # Initialize project
-    result = subprocess.run(
-        ["cm", "init", "--here", "python"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm init failed: {result.stderr}"
-
-    # Add custom commands with $WORKSPACE variable
-    config_file = temp_project_dir / "cm.yaml"
-    config_content = config_file.read_text()
-
-    custom_commands = """
-commands:
-  build:
-    command: "$WORKSPACE/scripts/build.sh"
-    description: "Build the project"
-  test:
-    command: "bash -c 'source $WORKSPACE/setup.sh && pytest'"
-    description: "Run tests with setup"
-"""
-    config_file.write_text(config_content + custom_commands)
-
-    # Regenerate
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm update failed: {result.stderr}"
-
-    # Check run.sh has escaped dollar signs
-    run_sh_content = (temp_project_dir / "run.sh").read_text()
-    assert r"\$WORKSPACE/scripts/build.sh" in run_sh_content, (
-        "run.sh should have escaped $WORKSPACE in build command"
-    )
-    assert r"source \$WORKSPACE/setup.sh" in run_sh_content, (
-        "run.sh should have escaped $WORKSPACE in test command"
-    )
-
-
-def test_custom_commands_with_ports(temp_project_dir):
-    """Test that port publishing flags are generated in run.sh."""
-    # Initialise project
-    result = subprocess.run(
-        ["cm", "init", "--here", "python"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm init failed: {result.stderr}"
-
-    # Add custom command with ports
-    config_file = temp_project_dir / "cm.yaml"
-    config_content = config_file.read_text()
-
-    custom_commands = """
-commands:
-  serve:
-    command: "python -m http.server 8000"
-    description: "Start dev server"
-    ports:
-      - "8000:8000"
-      - "8443:443"
-"""
-    config_file.write_text(config_content + custom_commands)
-
-    # Regenerate files
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=temp_project_dir,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"cm update failed: {result.stderr}"
-
-    # Check run.sh has --publish flags
-    run_sh_content = (temp_project_dir / "run.sh").read_text()
-    assert '--publish" "8000:8000"' in run_sh_content, (
-        "run.sh missing --publish for port 8000"
-    )
-    assert '--publish" "8443:443"' in run_sh_content, (
-        "run.sh missing --publish for port 8443"
-    )
+    result = shellcheck_results()[variant]
+    assert result, f"shellcheck failed for run.sh ({variant}):\n{result}"
@@ -1,11 +1,19 @@
 """Integration tests for project generation and validation."""
 
+import os
 import shutil
-import subprocess
-from pathlib import Path
 
 import pytest
 
+from tests.utils.cli import run_cm
+from tests.utils.validation import (
+    validate_dockerfiles,
+    validate_no_consecutive_blank_lines,
+    validate_shell_scripts,
+    validate_yaml,
+    validate_yaml_format,
+)
+
 # Test cases: (name, template)
 TEST_CASES = [
     ("python", "python"),
@@ -19,153 +27,103 @@ TEST_CASES = [
     ("nvidia-cuda", "nvidia/cuda:12.4.0-runtime-ubuntu22.04"),
 ]
 
-# Linting tools (optional)
-LINTERS = {
-    "yamlfmt": shutil.which("yamlfmt"),
-    "hadolint": shutil.which("hadolint"),
-    "shellcheck": shutil.which("shellcheck"),
-}
+# Files every generated project must contain
+EXPECTED_FILES = frozenset(
+    {"Dockerfile", "cm.yaml", "build.sh", "run.sh", ".gitignore", "workspace"}
+)
 
 
 @pytest.fixture(scope="session")
-def test_output_dir():
-    """Create directory for test projects in repo for manual inspection."""
-    import os
-
-    repo_root = Path(os.getcwd())
-    output_dir = repo_root / "test-generated-projects"
+def test_output_dir(pytestconfig):
+    """Create directory for test projects in repo for manual inspection.
+
+    Every test case writes only to its own subdirectory, so pytest-xdist
+    workers can share this directory. It is anchored at the rootdir rather
+    than the working directory so all workers agree on where it is.
+    """
+    output_dir = pytestconfig.rootpath / "test-generated-projects"
     output_dir.mkdir(exist_ok=True)
     return output_dir
 
 
-def validate_yaml(yaml_file: Path) -> bool:
-    """Validate YAML file with yamlfmt."""
-    if not LINTERS["yamlfmt"]:
-        return True
-    result = subprocess.run(
-        [
-            "yamlfmt",
-            "-formatter",
-            "retain_line_breaks=true",
-            "-lint",
-            str(yaml_file),
-        ],
-        capture_output=True,
-    )
-    return result.returncode == 0
-
-
-def validate_dockerfile(dockerfile: Path) -> bool:
-    """Validate Dockerfile with hadolint."""
-    if not LINTERS["hadolint"]:
-        return True
-    hadolint_config = Path(__file__).parent.parent / "fixtures" / "hadolint.yaml"
-    result = subprocess.run(
-        [
-            "hadolint",
-            "--config",
-            str(hadolint_config),
-            "--failure-threshold",
-            "warning",
-            str(dockerfile),
-        ],
-        capture_output=True,
-    )
-    return result.returncode == 0
-
-
-def validate_shell_script(script: Path) -> bool:
-    """Validate shell script with shellcheck."""
-    if not LINTERS["shellcheck"]:
-        return True
-    result = subprocess.run(
-        ["shellcheck", str(script)],
-        capture_output=True,
-    )
-    return result.returncode == 0
-
-
-def validate_no_consecutive_blank_lines(file_path: Path) -> bool:
-    """Validate that file has no more than one consecutive blank line."""
-    with open(file_path) as f:
-        lines = f.readlines()
-
-    consecutive_blanks = 0
-    max_consecutive = 0
-
-    for line in lines:
-        if line.strip() == "":
-            consecutive_blanks += 1
-            max_consecutive = max(max_consecutive, consecutive_blanks)
-        else:
-            consecutive_blanks = 0
-
-    return max_consecutive <= 1
+@pytest.fixture(scope="session")
+def lint_results(initialized_project):
+    """Return a function that lints every template's files on its first call.
+
+    The Dockerfiles and scripts of all TEST_CASES are linted with one call per
+    linter, and the results are returned as a dict keyed by path in the
+    initialized_project directories.
+    """
+    results = {}
+
+    def _lint_results():
+        if results:
+            return results
+        dockerfiles = []
+        scripts = []
+        for _, template in TEST_CASES:
+            project_dir, _ = initialized_project(template)
+            names = {entry.name for entry in os.scandir(project_dir)}
+            if "Dockerfile" in names:
+                dockerfiles.append(project_dir / "Dockerfile")
+            for script in ("build.sh", "run.sh"):
+                if script in names:
+                    scripts.append(project_dir / script)
+
+        results.update(validate_dockerfiles(dockerfiles))
+        results.update(validate_shell_scripts(scripts, check_formatting=False))
+        return results
+
+    return _lint_results
 
 
 @pytest.mark.parametrize("name,template", TEST_CASES)
-def test_project_generation(name, template, test_output_dir):
+def test_project_generation(
+    name, template, test_output_dir, initialized_project, lint_results
+):
     """Test that project generation works and produces valid files."""
-    # Create project directory
-    project_dir = test_output_dir / name
-    project_dir.mkdir(parents=True, exist_ok=True)
-
-    # Run cm init
-    result = subprocess.run(
-        ["cm", "init", "--here", template],
-        cwd=project_dir,
-        capture_output=True,
-        text=True,
-    )
+    # Run cm init once per template, then copy it out for manual inspection
+    init_dir, result = initialized_project(template)
     assert result.returncode == 0, f"cm init failed: {result.stderr}"
 
+    project_dir = test_output_dir / name
+    shutil.copytree(init_dir, project_dir, dirs_exist_ok=True)
+
     # Check all expected files exist
-    expected_files = [
-        "Dockerfile",
-        "cm.yaml",
-        "build.sh",
-        "run.sh",
-        ".gitignore",
-        "workspace",
-    ]
-    for file in expected_files:
-        file_path = project_dir / file
-        assert file_path.exists(), f"Missing file: {file}"
+    names = {entry.name for entry in os.scandir(project_dir)}
+    missing = EXPECTED_FILES - names
+    assert not missing, f"Missing files: {sorted(missing)}"
 
     # Justfile should NOT be generated in v3
-    assert not (project_dir / "Justfile").exists(), (
-        "Justfile should not be generated in v3"
-    )
+    assert "Justfile" not in names, "Justfile should not be generated in v3"
 
-    # Validate files with linters
-    assert validate_yaml(project_dir / "cm.yaml"), "YAML validation failed: cm.yaml"
-    assert validate_dockerfile(project_dir / "Dockerfile"), (
-        "Dockerfile validation failed"
-    )
-    assert validate_shell_script(project_dir / "build.sh"), "build.sh validation failed"
-    assert validate_shell_script(project_dir / "run.sh"), "run.sh validation failed"
+    # Validate files. The linters ran once over every template's output.
+    result = validate_yaml(project_dir / "cm.yaml")
+    assert result, f"cm.yaml validation failed:\n{result}"
+    lint = lint_results()
+    for file_name in ["Dockerfile", "build.sh", "run.sh"]:
+        result = lint[init_dir / file_name]
+        assert result, f"{file_name} validation failed:\n{result}"
 
     # Validate no excessive blank lines in generated files
-    for file_name in ["Dockerfile", "build.sh", "run.sh", "cm.yaml"]:
-        file_path = project_dir / file_name
-        assert validate_no_consecutive_blank_lines(file_path), (
-            f"{file_name} has more than one consecutive blank line"
-        )
+    contents = {
+        file_name: (project_dir / file_name).read_bytes()
+        for file_name in ["Dockerfile", "build.sh", "run.sh", "cm.yaml"]
+    }
+    for file_name, content in contents.items():
+        result = validate_no_consecutive_blank_lines(content)
+        assert result, f"{file_name}: {result}"
 
     # Validate YAML is readable by cm
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=project_dir,
-        capture_output=True,
-        text=True,
-    )
+    result = run_cm(["update"], cwd=project_dir)
     assert result.returncode == 0, f"cm update failed: {result.stderr}"
 
     # Check config uses 'from:' not 'frm:'
-    config_content = (project_dir / "cm.yaml").read_text()
+    config_content = contents["cm.yaml"].decode()
     assert "frm:" not in config_content, "Config uses 'frm:' instead of 'from:'"
 
-    # Check Dockerfile has required stages
+    # Check Dockerfile has required stages. cm update rewrote it, so read it
+    # fresh rather than reusing the contents read above.
     dockerfile_content = (project_dir / "Dockerfile").read_text()
     assert "FROM" in dockerfile_content and "AS base" in dockerfile_content, (
         "Dockerfile missing base stage"
@@ -181,3 +139,14 @@ def test_project_generation(name, template, test_output_dir):
     assert "github.com/markhedleyjones/container-magic" in comment_lines[0], (
         "Config missing repository link"
     )
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("name,template", TEST_CASES)
+def test_generated_config_formatting(name, template, initialized_project):
+    """Test that the generated cm.yaml passes yamlfmt lint."""
+    project_dir, result = initialized_project(template)
+    assert result.returncode == 0, f"cm init failed: {result.stderr}"
+
+    result = validate_yaml_format(project_dir / "cm.yaml")
+    assert result, f"yamlfmt validation failed: cm.yaml\n{result}"
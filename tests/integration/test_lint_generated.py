@@ -4,7 +4,6 @@ Ensures that container-magic produces output that passes hadolint (Dockerfiles)
 and shellcheck + shfmt (shell scripts) for a wide range of configurations.
 """
 
-import shutil
 import subprocess
 from pathlib import Path
 
@@ -14,6 +13,7 @@ from container_magic.core.config import ContainerMagicConfig
 from container_magic.generators.build_script import generate_build_script
 from container_magic.generators.dockerfile import generate_dockerfile
 from container_magic.generators.run_script import generate_run_script
+from tests.utils.files import link_or_copy
 
 FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "configs"
 HADOLINT_CONFIG = Path(__file__).parent.parent / "fixtures" / "hadolint.yaml"
@@ -21,11 +21,6 @@ HADOLINT_CONFIG = Path(__file__).parent.parent / "fixtures" / "hadolint.yaml"
 # All fixture configs to test
 FIXTURE_CONFIGS = sorted(FIXTURES_DIR.glob("*.yaml"))
 
-# Tool availability
-HAS_HADOLINT = shutil.which("hadolint") is not None
-HAS_SHELLCHECK = shutil.which("shellcheck") is not None
-HAS_SHFMT = shutil.which("shfmt") is not None
-
 
 def _generate_files(config_path: Path, output_dir: Path):
     """Generate Dockerfile, build.sh, and run.sh from a config file."""
@@ -41,24 +36,31 @@ def _generate_files(config_path: Path, output_dir: Path):
 
 
 @pytest.fixture(
-    params=[p.stem for p in FIXTURE_CONFIGS], ids=[p.stem for p in FIXTURE_CONFIGS]
+    scope="module",
+    params=[p.stem for p in FIXTURE_CONFIGS],
+    ids=[p.stem for p in FIXTURE_CONFIGS],
 )
-def generated_project(request, tmp_path):
-    """Generate a project from each fixture config into a temp directory."""
+def generated_project(request, tmp_path_factory):
+    """Generate a project from each fixture config into a temp directory.
+
+    Generated once per config for the module; tests only read the files.
+    """
     config_name = request.param
     config_path = FIXTURES_DIR / f"{config_name}.yaml"
+    tmp_path = tmp_path_factory.mktemp(config_name)
 
-    # Copy config to temp dir and generate
-    shutil.copy(config_path, tmp_path / "cm.yaml")
+    # Link config into temp dir and generate
+    link_or_copy(config_path, tmp_path / "cm.yaml")
     _generate_files(tmp_path / "cm.yaml", tmp_path)
 
     return tmp_path
 
 
 class TestDockerfileLinting:
-    @pytest.mark.skipif(not HAS_HADOLINT, reason="hadolint not installed")
-    def test_hadolint_passes(self, generated_project):
+    def test_hadolint_passes(self, linters, generated_project):
         """Generated Dockerfile passes hadolint with no warnings (ignoring user-content rules)."""
+        if not linters["hadolint"]:
+            pytest.skip("hadolint not installed")
         dockerfile = generated_project / "Dockerfile"
         result = subprocess.run(
             [
@@ -78,9 +80,10 @@ class TestDockerfileLinting:
 
 
 class TestShellScriptLinting:
-    @pytest.mark.skipif(not HAS_SHELLCHECK, reason="shellcheck not installed")
-    def test_shellcheck_build_sh(self, generated_project):
+    def test_shellcheck_build_sh(self, linters, generated_project):
         """Generated build.sh passes shellcheck."""
+        if not linters["shellcheck"]:
+            pytest.skip("shellcheck not installed")
         result = subprocess.run(
             ["shellcheck", str(generated_project / "build.sh")],
             capture_output=True,
@@ -90,9 +93,10 @@ class TestShellScriptLinting:
             f"shellcheck build.sh:\n{result.stdout}\n{result.stderr}"
         )
 
-    @pytest.mark.skipif(not HAS_SHELLCHECK, reason="shellcheck not installed")
-    def test_shellcheck_run_sh(self, generated_project):
+    def test_shellcheck_run_sh(self, linters, generated_project):
         """Generated run.sh passes shellcheck."""
+        if not linters["shellcheck"]:
+            pytest.skip("shellcheck not installed")
         result = subprocess.run(
             ["shellcheck", str(generated_project / "run.sh")],
             capture_output=True,
@@ -102,9 +106,10 @@ class TestShellScriptLinting:
             f"shellcheck run.sh:\n{result.stdout}\n{result.stderr}"
         )
 
-    @pytest.mark.skipif(not HAS_SHFMT, reason="shfmt not installed")
-    def test_shfmt_build_sh(self, generated_project):
+    def test_shfmt_build_sh(self, linters, generated_project):
         """Generated build.sh needs no formatting changes."""
+        if not linters["shfmt"]:
+            pytest.skip("shfmt not installed")
         result = subprocess.run(
             ["shfmt", "-d", str(generated_project / "build.sh")],
             capture_output=True,
@@ -114,9 +119,10 @@ class TestShellScriptLinting:
             f"shfmt build.sh formatting diff:\n{result.stdout}"
         )
 
-    @pytest.mark.skipif(not HAS_SHFMT, reason="shfmt not installed")
-    def test_shfmt_run_sh(self, generated_project):
+    def test_shfmt_run_sh(self, linters, generated_project):
         """Generated run.sh needs no formatting changes."""
+        if not linters["shfmt"]:
+            pytest.skip("shfmt not installed")
         result = subprocess.run(
             ["shfmt", "-d", str(generated_project / "run.sh")],
             capture_output=True,
@@ -126,11 +132,13 @@ class TestShellScriptLinting:
 
 
 @pytest.fixture(
+    scope="module",
     params=["single_symlink", "multiple_symlinks", "nested_symlink"],
     ids=["single_symlink", "multiple_symlinks", "nested_symlink"],
 )
-def generated_project_with_symlinks(request, tmp_path):
-    """Generate a project with workspace symlinks for linting."""
+def generated_project_with_symlinks(request, tmp_path_factory):
+    """Generate a project with workspace symlinks for linting, once per layout."""
+    tmp_path = tmp_path_factory.mktemp(request.param)
     config_dict = {
         "names": {
             "image": "test-symlinks",
@@ -184,8 +192,9 @@ def generated_project_with_symlinks(request, tmp_path):
 class TestSymlinkLinting:
     """Lint generated files when workspace symlinks trigger staging code paths."""
 
-    @pytest.mark.skipif(not HAS_HADOLINT, reason="hadolint not installed")
-    def test_hadolint_passes(self, generated_project_with_symlinks):
+    def test_hadolint_passes(self, linters, generated_project_with_symlinks):
+        if not linters["hadolint"]:
+            pytest.skip("hadolint not installed")
         dockerfile = generated_project_with_symlinks / "Dockerfile"
         result = subprocess.run(
             [
@@ -203,8 +212,9 @@ class TestSymlinkLinting:
             f"hadolint found issues:\n{result.stdout}\n{result.stderr}"
         )
 
-    @pytest.mark.skipif(not HAS_SHELLCHECK, reason="shellcheck not installed")
-    def test_shellcheck_build_sh(self, generated_project_with_symlinks):
+    def test_shellcheck_build_sh(self, linters, generated_project_with_symlinks):
+        if not linters["shellcheck"]:
+            pytest.skip("shellcheck not installed")
         result = subprocess.run(
             ["shellcheck", str(generated_project_with_symlinks / "build.sh")],
             capture_output=True,
@@ -214,8 +224,9 @@ class TestSymlinkLinting:
             f"shellcheck build.sh:\n{result.stdout}\n{result.stderr}"
         )
 
-    @pytest.mark.skipif(not HAS_SHFMT, reason="shfmt not installed")
-    def test_shfmt_build_sh(self, generated_project_with_symlinks):
+    def test_shfmt_build_sh(self, linters, generated_project_with_symlinks):
+        if not linters["shfmt"]:
+            pytest.skip("shfmt not installed")
         result = subprocess.run(
             ["shfmt", "-d", str(generated_project_with_symlinks / "build.sh")],
             capture_output=True,
@@ -1,285 +1,128 @@
 """Integration tests for package installation across different base images."""
 
 import subprocess
-from pathlib import Path
-from tempfile import TemporaryDirectory
 
 import pytest
+import yaml
+
+from tests.utils.cli import run_cm
+from tests.utils.container import run_with_early_skip
+from tests.utils.files import write_files
+
+
+@pytest.fixture
+def runtime(container_runtime):
+    """Container runtime detected once per session; skip the test without one."""
+    if container_runtime is None:
+        pytest.skip("No container runtime found (docker or podman)")
+    return container_runtime
+
+
+def _config(image, base, step):
+    """Return a cm.yaml installing packages with a single step on base."""
+    return yaml.safe_dump(
+        {
+            "names": {"image": image, "workspace": "workspace", "user": "root"},
+            "stages": {
+                "base": {"from": base, "steps": [step]},
+                "development": {"from": "base"},
+                "production": {"from": "base"},
+            },
+        },
+        sort_keys=False,
+    )
+
+
+def _generate_project(project_dir, config):
+    """Write cm.yaml and a workspace to project_dir, then run cm update.
 
+    cm update also writes a .dockerignore that limits the build context to
+    the workspace, so builds only send the files they use.
+    """
+    write_files(project_dir, {"cm.yaml": config, "workspace/test.txt": "test"})
 
-def get_runtime():
-    """Detect available container runtime (docker or podman)."""
-    for runtime in ["docker", "podman"]:
-        try:
-            subprocess.run(
-                [runtime, "--version"],
-                capture_output=True,
-                timeout=5,
-                check=True,
-            )
-            return runtime
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            continue
-    pytest.skip("No container runtime found (docker or podman)")
+    result = run_cm(["update"], cwd=project_dir)
+    assert result.returncode == 0, f"cm update failed: {result.stderr}"
 
 
 def run_command(cmd, cwd, timeout=300):
-    """Run command and return output."""
+    """Run command and return its return code, stdout and stderr as bytes."""
     result = subprocess.run(
         cmd,
         cwd=cwd,
-        capture_output=True,
-        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
         timeout=timeout,
     )
     return result.returncode, result.stdout, result.stderr
 
 
-def test_package_installation_python_slim(debian_base_image):
-    """Test that packages install and are accessible in a Debian-based image."""
-    runtime = get_runtime()
-    config = """
-names:
-  image: test-python
-  workspace: workspace
-  user: root
-
-stages:
-  base:
-    from: cm-test:debian
-    steps:
-      - apt-get: {install: [curl]}
-  development:
-    from: base
-  production:
-    from: base
-"""
-
-    with TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-
-        # Write config
-        (tmpdir_path / "cm.yaml").write_text(config)
-
-        # Create empty workspace
-        (tmpdir_path / "workspace").mkdir()
-        (tmpdir_path / "workspace" / "test.txt").write_text("test")
-
-        # Generate files
-        returncode, stdout, stderr = run_command(["cm", "update"], tmpdir_path)
-        assert returncode == 0, f"cm update failed: {stderr}"
-
-        # Build the image
-        returncode, stdout, stderr = run_command(
-            [runtime, "build", "-t", "test-python:latest", "."],
-            tmpdir_path,
-            timeout=600,
-        )
-        assert returncode == 0, f"{runtime} build failed: {stderr}"
-
-        # Run curl --version in the built image
-        returncode, stdout, stderr = run_command(
-            [
-                runtime,
-                "run",
-                "--rm",
-                "test-python:latest",
-                "curl",
-                "--version",
-            ],
-            tmpdir_path,
-        )
-        assert returncode == 0, f"curl failed in container: {stderr}"
-        assert "curl" in stdout.lower(), f"curl version not found in output: {stdout}"
-
-
-@pytest.mark.slow
-def test_package_installation_debian():
-    """Test that packages install and are accessible in debian:bookworm base."""
-    runtime = get_runtime()
-    config = """
-names:
-  image: test-debian
-  workspace: workspace
-  user: root
-
-stages:
-  base:
-    from: debian:bookworm
-    steps:
-      - apt-get: {install: [curl]}
-  development:
-    from: base
-  production:
-    from: base
-"""
-
-    with TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
+def _build(runtime, project_dir, image):
+    """Build project_dir as image:latest, skipping on registry errors."""
+    result = run_with_early_skip(
+        [runtime, "build", "-t", f"{image}:latest", "."], project_dir, timeout=600
+    )
+    assert result.returncode == 0, (
+        f"{runtime} build failed: {result.stderr.decode(errors='replace')}"
+    )
 
-        # Write config
-        (tmpdir_path / "cm.yaml").write_text(config)
 
-        # Create empty workspace
-        (tmpdir_path / "workspace").mkdir()
-        (tmpdir_path / "workspace" / "test.txt").write_text("test")
+def _run(runtime, project_dir, image, *command):
+    """Run command in a fresh image:latest container and return its stdout."""
+    returncode, stdout, stderr = run_command(
+        [runtime, "run", "--rm", f"{image}:latest", *command],
+        project_dir,
+    )
+    assert returncode == 0, (
+        f"{command[0]} failed in container: {stderr.decode(errors='replace')}"
+    )
+    return stdout.decode(errors="replace")
 
-        # Generate files
-        returncode, stdout, stderr = run_command(["cm", "update"], tmpdir_path)
-        assert returncode == 0, f"cm update failed: {stderr}"
 
-        # Build the image
-        returncode, stdout, stderr = run_command(
-            [runtime, "build", "-t", "test-debian:latest", "."],
-            tmpdir_path,
-            timeout=600,
-        )
-        assert returncode == 0, f"{runtime} build failed: {stderr}"
+def test_package_installation_python_slim(debian_base_image, runtime, tmp_path):
+    """Test that packages install and are accessible in a Debian-based image."""
+    config = _config(
+        "test-python", debian_base_image, {"apt-get": {"install": ["curl"]}}
+    )
+    _generate_project(tmp_path, config)
+    _build(runtime, tmp_path, "test-python")
 
-        # Run curl --version in the built image
-        returncode, stdout, stderr = run_command(
-            [
-                runtime,
-                "run",
-                "--rm",
-                "test-debian:latest",
-                "curl",
-                "--version",
-            ],
-            tmpdir_path,
-        )
-        assert returncode == 0, f"curl failed in container: {stderr}"
-        assert "curl" in stdout.lower(), f"curl version not found in output: {stdout}"
+    stdout = _run(runtime, tmp_path, "test-python", "curl", "--version")
+    assert "curl" in stdout.lower(), f"curl version not found in output: {stdout}"
 
 
 @pytest.mark.slow
-def test_package_installation_alpine():
-    """Test that packages install and are accessible in alpine:latest base."""
-    runtime = get_runtime()
-    config = """
-names:
-  image: test-alpine
-  workspace: workspace
-  user: root
-
-stages:
-  base:
-    from: alpine:latest
-    steps:
-      - apk: {add: [curl]}
-  development:
-    from: base
-  production:
-    from: base
-"""
-
-    with TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-
-        # Write config
-        (tmpdir_path / "cm.yaml").write_text(config)
-
-        # Create empty workspace
-        (tmpdir_path / "workspace").mkdir()
-        (tmpdir_path / "workspace" / "test.txt").write_text("test")
-
-        # Generate files
-        returncode, stdout, stderr = run_command(["cm", "update"], tmpdir_path)
-        assert returncode == 0, f"cm update failed: {stderr}"
-
-        # Build the image
-        returncode, stdout, stderr = run_command(
-            [runtime, "build", "-t", "test-alpine:latest", "."],
-            tmpdir_path,
-            timeout=600,
-        )
-        assert returncode == 0, f"{runtime} build failed: {stderr}"
-
-        # Run curl --version in the built image
-        returncode, stdout, stderr = run_command(
-            [
-                runtime,
-                "run",
-                "--rm",
-                "test-alpine:latest",
-                "curl",
-                "--version",
-            ],
-            tmpdir_path,
-        )
-        assert returncode == 0, f"curl failed in container: {stderr}"
-        assert "curl" in stdout.lower(), f"curl version not found in output: {stdout}"
+@pytest.mark.parametrize(
+    "base,step,image",
+    [
+        ("debian:bookworm", {"apt-get": {"install": ["curl"]}}, "test-debian"),
+        ("alpine:latest", {"apk": {"add": ["curl"]}}, "test-alpine"),
+    ],
+    ids=["debian", "alpine"],
+)
+def test_package_installation(runtime, tmp_path, base, step, image):
+    """Test that packages install and are accessible on a stock base image."""
+    _generate_project(tmp_path, _config(image, base, step))
+    _build(runtime, tmp_path, image)
+
+    stdout = _run(runtime, tmp_path, image, "curl", "--version")
+    assert "curl" in stdout.lower(), f"curl version not found in output: {stdout}"
 
 
 @pytest.mark.slow
-def test_multiple_packages_installation(debian_base_image):
+def test_multiple_packages_installation(debian_base_image, runtime, tmp_path):
     """Test that multiple packages install and are accessible."""
-    runtime = get_runtime()
-    config = """
-names:
-  image: test-multi
-  workspace: workspace
-  user: root
-
-stages:
-  base:
-    from: cm-test:debian
-    steps:
-      - apt-get: {install: [curl, git, ca-certificates]}
-  development:
-    from: base
-  production:
-    from: base
-"""
-
-    with TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-
-        # Write config
-        (tmpdir_path / "cm.yaml").write_text(config)
-
-        # Create empty workspace
-        (tmpdir_path / "workspace").mkdir()
-        (tmpdir_path / "workspace" / "test.txt").write_text("test")
-
-        # Generate files
-        returncode, stdout, stderr = run_command(["cm", "update"], tmpdir_path)
-        assert returncode == 0, f"cm update failed: {stderr}"
-
-        # Build the image
-        returncode, stdout, stderr = run_command(
-            [runtime, "build", "-t", "test-multi:latest", "."],
-            tmpdir_path,
-            timeout=600,
-        )
-        assert returncode == 0, f"{runtime} build failed: {stderr}"
-
-        # Test curl
-        returncode, stdout, stderr = run_command(
-            [
-                runtime,
-                "run",
-                "--rm",
-                "test-multi:latest",
-                "curl",
-                "--version",
-            ],
-            tmpdir_path,
-        )
-        assert returncode == 0, f"curl failed: {stderr}"
-        assert "curl" in stdout.lower()
+    config = _config(
+        "test-multi",
+        debian_base_image,
+        {"apt-get": {"install": ["curl", "git", "ca-certificates"]}},
+    )
+    _generate_project(tmp_path, config)
+    _build(runtime, tmp_path, "test-multi")
 
-        # Test git
-        returncode, stdout, stderr = run_command(
-            [
-                runtime,
-                "run",
-                "--rm",
-                "test-multi:latest",
-                "git",
-                "--version",
-            ],
-            tmpdir_path,
-        )
-        assert returncode == 0, f"git failed: {stderr}"
-        assert "git" in stdout.lower()
+    # Check curl and git in one container, since startup dominates the runtime
+    stdout = _run(
+        runtime, tmp_path, "test-multi", "sh", "-c", "curl --version && git --version"
+    )
+    assert "curl" in stdout.lower(), f"curl version not found in output: {stdout}"
+    assert "git version" in stdout.lower(), f"git version not found in output: {stdout}"
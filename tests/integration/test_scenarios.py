@@ -14,6 +14,10 @@ from pathlib import Path
 
 import pytest
 
+from tests.utils.cli import run_cm
+from tests.utils.container import build_image
+from tests.utils.files import link_or_copy
+
 pytestmark = [
     pytest.mark.slow,
     pytest.mark.skipif(
@@ -36,38 +40,27 @@ def _runtime():
 def _setup_project(tmp_path, config_name, workspace_scripts=None):
     """Set up a project directory with config and workspace scripts."""
     project = tmp_path / "project"
-    project.mkdir()
     workspace = project / "workspace"
-    workspace.mkdir()
+    workspace.mkdir(parents=True)
 
-    shutil.copy(CONFIGS_DIR / config_name, project / "cm.yaml")
+    # Neither the config nor the scripts are written to, so link them
+    link_or_copy(CONFIGS_DIR / config_name, project / "cm.yaml")
 
     if workspace_scripts:
         for script_name in workspace_scripts:
-            shutil.copy(SCRIPTS_DIR / script_name, workspace / script_name)
+            link_or_copy(SCRIPTS_DIR / script_name, workspace / script_name)
 
     return project
 
 
 def _build_and_run(project, command=None, timeout=300):
-    """Run cm update, build.sh, and optionally run a command via run.sh."""
-    result = subprocess.run(
-        ["cm", "update"],
-        cwd=project,
-        capture_output=True,
-        text=True,
-    )
+    """Run cm update, build the image, and optionally run a command via run.sh."""
+    result = run_cm(["update"], cwd=project)
     assert result.returncode == 0, f"cm update failed:\n{result.stderr}"
 
-    result = subprocess.run(
-        ["./build.sh"],
-        cwd=project,
-        capture_output=True,
-        text=True,
-        timeout=timeout,
-    )
+    result = build_image(project, timeout=timeout)
     assert result.returncode == 0, (
-        f"build.sh failed:\nstdout: {result.stdout}\nstderr: {result.stderr}"
+        f"Image build failed:\n{result.stderr.decode(errors='replace')}"
     )
 
     if command is None:
@@ -98,24 +91,14 @@ def test_multistage(debian_base_image, tmp_path):
     project = _setup_project(
         tmp_path, "scenario_multistage.yaml", ["check_import.py"]
     )
-    result = _build_and_run(project, ["python3", "check_import.py"])
+    # Run the script and check workspace ownership in one container. The
+    # workspace is root-owned because production copies it without --chown.
+    result = _build_and_run(
+        project,
+        ["bash", "-c", "python3 check_import.py && stat -c '%U:%G' check_import.py"],
+    )
     assert result.returncode == 0, f"Script failed:\n{result.stderr}"
     assert "import_ok" in result.stdout
-
-    # Verify workspace is root-owned (production copies without --chown)
-    result = subprocess.run(
-        [
-            "./run.sh",
-            "bash",
-            "-c",
-            "stat -c '%U:%G' check_import.py",
-        ],
-        cwd=project,
-        capture_output=True,
-        text=True,
-        timeout=30,
-    )
-    assert result.returncode == 0
     assert "root:root" in result.stdout, (
         f"Expected root:root ownership, got: {result.stdout}"
     )
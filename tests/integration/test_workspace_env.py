@@ -5,30 +5,70 @@ container without shell wrapping.  This matches docker run behaviour.
 Shell features (pipes, &&) require explicit ``bash -c``.
 """
 
-import shutil
 import subprocess
-import tempfile
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 import pytest
 
+from container_magic.core.config import ContainerMagicConfig
+from tests.utils.cli import run_cm
+from tests.utils.container import run_with_early_skip
+from tests.utils.files import write_files
 
-def _detect_runtime():
-    """Detect container runtime, matching build.sh/cm preference order."""
-    if shutil.which("docker"):
-        return "docker"
-    elif shutil.which("podman"):
-        return "podman"
-    return None
+pytestmark = pytest.mark.docker
 
+# Prints a WORKSPACE= line, then DIR_OK, the test file and FILE_OK if they
+# are there, then the workspace listing
+WORKSPACE_PROBE = (
+    'echo "WORKSPACE=${WORKSPACE-<unset>}"; '
+    'test -d "$WORKSPACE" && echo DIR_OK; '
+    'cat "$WORKSPACE/test.txt" && echo FILE_OK; '
+    'ls "$WORKSPACE/"'
+)
 
-@pytest.fixture
-def test_project(debian_base_image):
-    """Create a temporary test project with cm-test:debian base."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        project_dir = Path(tmpdir)
 
-        config_content = """\
+def _dev_container(project_dir):
+    """Return the name cm run gives the project's development container."""
+    config = ContainerMagicConfig.from_yaml(project_dir / "cm.yaml")
+    return f"{config.names.image}-development"
+
+
+def _probe_workspace(command, label, cwd=None):
+    """Run WORKSPACE_PROBE in one container call.
+
+    command is the prefix that runs a program in the container, such as
+    ``["cm", "run"]`` or ``["./run.sh"]``. Returns the workspace path, checked
+    to be set and absolute, and the remaining output lines.
+    """
+    result = subprocess.run(
+        [*command, "bash", "-c", WORKSPACE_PROBE],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, f"{label} probe failed: {result.stderr}"
+    lines = result.stdout.splitlines()
+    assert lines and lines[0].startswith("WORKSPACE="), (
+        f"Unexpected {label} probe output: {lines}"
+    )
+    workspace_path = lines[0].split("=", 1)[1]
+    assert PurePosixPath(workspace_path).is_absolute(), (
+        f"WORKSPACE is not an absolute path in {label}: {workspace_path!r}"
+    )
+    return workspace_path, lines[1:]
+
+
+@pytest.fixture(scope="module")
+def test_project(tmp_path_factory, debian_base_image, container_runtime):
+    """Generate and build a test project with cm-test:debian base, once.
+
+    Returns the project directory and the $WORKSPACE a fresh ``cm run``
+    printed. The development container is then left running, so tests exec
+    into it instead of starting a new container.
+    """
+    project_dir = tmp_path_factory.mktemp("workspace_env")
+
+    config_content = """\
 names:
   image: test-workspace-env
   workspace: workspace
@@ -44,109 +84,91 @@ stages:
     steps:
       - copy: workspace
 """
-        (project_dir / "cm.yaml").write_text(config_content)
-
-        workspace_dir = project_dir / "workspace"
-        workspace_dir.mkdir()
-        (workspace_dir / "test.txt").write_text("workspace test file\n")
-
-        # Generate files
-        result = subprocess.run(
-            ["cm", "update"],
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0, f"cm update failed: {result.stderr}"
-
-        yield project_dir
+    write_files(
+        project_dir,
+        {"cm.yaml": config_content, "workspace/test.txt": "workspace test file\n"},
+    )
 
+    # Generate files
+    result = run_cm(["update"], cwd=project_dir)
+    assert result.returncode == 0, f"cm update failed: {result.stderr}"
 
-def test_workspace_env_points_to_mounted_path(test_project):
-    """Test that $WORKSPACE env var is properly set in the container."""
     # Build the image
-    build_result = subprocess.run(
-        ["cm", "build"],
-        cwd=test_project,
-        capture_output=True,
-        text=True,
+    build_result = run_with_early_skip(["cm", "build"], project_dir)
+    assert build_result.returncode == 0, (
+        f"Build failed: {build_result.stderr.decode(errors='replace')}"
     )
-    assert build_result.returncode == 0, f"Build failed: {build_result.stderr}"
-
-    # Exec form: each argument is a separate list element (no shell wrapping)
 
-    # Test 1: Verify $WORKSPACE variable exists and is set
+    # Check what a fresh cm run sees (exec form), before a running container
+    # would make cm run exec into it instead
     result = subprocess.run(
         ["cm", "run", "printenv", "WORKSPACE"],
-        cwd=test_project,
+        cwd=project_dir,
         capture_output=True,
         text=True,
     )
-    assert result.returncode == 0, f"Command failed: {result.stderr}"
-    workspace_path = result.stdout.strip()
-    assert workspace_path, "WORKSPACE variable is empty or not set"
-    assert "/" in workspace_path, f"WORKSPACE path looks invalid: {workspace_path}"
-
-    # Test 2: Verify the workspace directory actually exists
-    result = subprocess.run(
-        ["cm", "run", "test", "-d", workspace_path],
-        cwd=test_project,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, (
-        f"WORKSPACE directory does not exist at {workspace_path}: {result.stderr}"
+    assert result.returncode == 0, f"cm run printenv failed: {result.stderr}"
+    cm_run_workspace = result.stdout.strip()
+
+    # Remove a container left behind by an interrupted run, then start one
+    # through cm run, so it has the usual mounts and env
+    remove_container = [container_runtime, "rm", "-f", _dev_container(project_dir)]
+    subprocess.run(
+        remove_container, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
     )
-
-    # Test 3: Verify workspace file is accessible
     result = subprocess.run(
-        ["cm", "run", "test", "-f", f"{workspace_path}/test.txt"],
-        cwd=test_project,
-        capture_output=True,
+        ["cm", "run", "--detach", "sleep", "infinity"],
+        cwd=project_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
         text=True,
     )
-    assert result.returncode == 0, (
-        f"Failed to access file via WORKSPACE: {result.stderr}"
-    )
+    assert result.returncode == 0, f"Failed to start container: {result.stderr}"
 
-    # Test 4: Verify $WORKSPACE path is consistent (same in multiple invocations)
-    result1 = subprocess.run(
-        ["cm", "run", "printenv", "WORKSPACE"],
-        cwd=test_project,
-        capture_output=True,
-        text=True,
-    )
-    result2 = subprocess.run(
-        ["cm", "run", "printenv", "WORKSPACE"],
-        cwd=test_project,
-        capture_output=True,
-        text=True,
-    )
-    assert result1.stdout.strip() == result2.stdout.strip(), (
-        f"WORKSPACE path changed: {result1.stdout.strip()} vs {result2.stdout.strip()}"
+    yield project_dir, cm_run_workspace
+
+    # sleep ignores the SIGTERM a stop sends, so remove it without waiting
+    subprocess.run(
+        remove_container, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
     )
 
-    # Test 5: Verify workspace contents are accessible
-    result = subprocess.run(
-        ["cm", "run", "ls", f"{workspace_path}/"],
-        cwd=test_project,
-        capture_output=True,
-        text=True,
+
+def test_workspace_env_points_to_mounted_path(test_project, container_runtime):
+    """Test that $WORKSPACE env var is properly set in the container."""
+    project_dir, cm_run_workspace = test_project
+
+    # Probe the variable, directory, file and listing in one exec, calling
+    # the runtime directly rather than starting cm for each probe
+    workspace_path, lines = _probe_workspace(
+        [container_runtime, "exec", _dev_container(project_dir)],
+        "development container",
     )
-    assert result.returncode == 0, f"Failed to list workspace: {result.stderr}"
-    assert "test.txt" in result.stdout, (
-        f"test.txt not found in workspace listing: {result.stdout}"
+
+    # Verify the workspace directory actually exists
+    assert "DIR_OK" in lines, f"WORKSPACE directory does not exist at {workspace_path}"
+
+    # Verify workspace file is accessible
+    assert "FILE_OK" in lines, f"Failed to access file via WORKSPACE: {lines}"
+
+    # Verify workspace contents are accessible
+    assert "test.txt" in lines, f"test.txt not found in workspace listing: {lines}"
+
+    # Verify a fresh cm run saw the same $WORKSPACE path
+    assert cm_run_workspace == workspace_path, (
+        f"WORKSPACE path changed: {workspace_path} vs {cm_run_workspace}"
     )
 
 
-@pytest.fixture
-def test_project_no_user(debian_base_image):
-    """Create a test project with no user configuration."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        project_dir = Path(tmpdir)
+@pytest.fixture(scope="module")
+def test_project_no_user(tmp_path_factory, debian_base_image):
+    """Create a test project with no user configuration.
 
-        # Create cm.yaml with no user section (runs as root)
-        config_content = """names:
+    Shared by the tests below, which each build a different target.
+    """
+    project_dir = tmp_path_factory.mktemp("workspace_env_no_user")
+
+    # Create cm.yaml with no user section (runs as root)
+    config_content = """names:
   image: test-no-user
   workspace: workspace
   user: root
@@ -161,36 +183,28 @@ stages:
     steps:
     - copy: workspace
 """
-        (project_dir / "cm.yaml").write_text(config_content)
-
-        # Create workspace with test file
-        workspace_dir = project_dir / "workspace"
-        workspace_dir.mkdir()
-        (workspace_dir / "test.txt").write_text("test content\n")
+    # Config plus a workspace with a test file
+    write_files(
+        project_dir,
+        {"cm.yaml": config_content, "workspace/test.txt": "test content\n"},
+    )
 
-        # Generate files
-        result = subprocess.run(
-            ["cm", "update"],
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0, f"cm update failed: {result.stderr}"
+    # Generate files
+    result = run_cm(["update"], cwd=project_dir)
+    assert result.returncode == 0, f"cm update failed: {result.stderr}"
 
-        yield project_dir
+    return project_dir
 
 
-def test_workspace_accessible_without_user_config(test_project_no_user):
+def test_workspace_accessible_without_user_config(
+    test_project_no_user, container_runtime
+):
     """Test that WORKSPACE is accessible when no user is configured (runs as root)."""
-    runtime = _detect_runtime()
-    if not runtime:
-        pytest.skip("Neither docker nor podman found")
-
     # Build development with --no-cache to avoid cache pollution from other builds
     # (different USER_HOME values can get cached in base stage layers)
-    build_result = subprocess.run(
+    build_result = run_with_early_skip(
         [
-            runtime,
+            container_runtime,
             "build",
             "--no-cache",
             "--target",
@@ -201,56 +215,30 @@ def test_workspace_accessible_without_user_config(test_project_no_user):
             "test-no-user:development",
             ".",
         ],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
+        test_project_no_user,
     )
-    assert build_result.returncode == 0, f"Dev build failed: {build_result.stderr}"
-
-    # Verify WORKSPACE env var is set (exec form)
-    result = subprocess.run(
-        ["cm", "run", "printenv", "WORKSPACE"],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
+    assert build_result.returncode == 0, (
+        f"Dev build failed: {build_result.stderr.decode(errors='replace')}"
     )
-    assert result.returncode == 0, f"Failed to get WORKSPACE: {result.stderr}"
-    workspace_path = result.stdout.strip()
-    assert workspace_path, "WORKSPACE should be set"
 
-    # Verify workspace directory exists at WORKSPACE path
-    result = subprocess.run(
-        ["cm", "run", "test", "-d", workspace_path],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, (
-        f"WORKSPACE directory not found at {workspace_path}: {result.stderr}"
+    # Verify WORKSPACE is set, is a directory and has the test file
+    workspace_path, lines = _probe_workspace(
+        ["cm", "run"], "cm run", cwd=test_project_no_user
     )
-
-    # Verify test file is accessible via WORKSPACE
-    result = subprocess.run(
-        ["cm", "run", "cat", f"{workspace_path}/test.txt"],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
-    )
-    assert result.returncode == 0, f"Failed to read test file: {result.stderr}"
-    assert "test content" in result.stdout
+    assert "DIR_OK" in lines, f"WORKSPACE directory not found at {workspace_path}"
+    assert "FILE_OK" in lines, f"Failed to read test file: {lines}"
+    assert "test content" in lines
 
 
-def test_workspace_in_production_without_user_config(test_project_no_user):
+def test_workspace_in_production_without_user_config(
+    test_project_no_user, container_runtime
+):
     """Test that WORKSPACE works in production image when no user is configured."""
-    runtime = _detect_runtime()
-    if not runtime:
-        pytest.skip("Neither docker nor podman found")
-
     # Build production with --no-cache to avoid cache pollution from development builds
     # (dev builds set USER_HOME dynamically, prod uses default /root)
-    build_result = subprocess.run(
+    build_result = run_with_early_skip(
         [
-            runtime,
+            container_runtime,
             "build",
             "--no-cache",
             "--target",
@@ -259,38 +247,17 @@ def test_workspace_in_production_without_user_config(test_project_no_user):
             "test-no-user:latest",
             ".",
         ],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
-    )
-    assert build_result.returncode == 0, f"Prod build failed: {build_result.stderr}"
-
-    # Run production image and check WORKSPACE (exec form via run.sh)
-    result = subprocess.run(
-        ["./run.sh", "printenv", "WORKSPACE"],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
+        test_project_no_user,
     )
-    assert result.returncode == 0, f"Failed to get WORKSPACE in prod: {result.stderr}"
-    workspace_path = result.stdout.strip()
-    assert workspace_path, "WORKSPACE should be set in production"
-
-    # Verify workspace directory exists
-    result = subprocess.run(
-        ["./run.sh", "test", "-d", workspace_path],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
+    assert build_result.returncode == 0, (
+        f"Prod build failed: {build_result.stderr.decode(errors='replace')}"
     )
-    assert result.returncode == 0, f"WORKSPACE not accessible in prod: {result.stderr}"
 
-    # Verify test file is embedded in production image
-    result = subprocess.run(
-        ["./run.sh", "cat", f"{workspace_path}/test.txt"],
-        cwd=test_project_no_user,
-        capture_output=True,
-        text=True,
+    # Run production image and check WORKSPACE, the directory and the
+    # embedded test file in one run.sh call
+    workspace_path, lines = _probe_workspace(
+        ["./run.sh"], "production", cwd=test_project_no_user
     )
-    assert result.returncode == 0, f"Test file not in prod image: {result.stderr}"
-    assert "test content" in result.stdout
+    assert "DIR_OK" in lines, f"WORKSPACE not accessible in prod: {workspace_path}"
+    assert "FILE_OK" in lines, f"Test file not in prod image: {lines}"
+    assert "test content" in lines
@@ -0,0 +1,29 @@
+"""Tests for the batch linters in tests.utils.validation."""
+
+import shutil
+
+import pytest
+
+from tests.utils.validation import _lint_dockerfiles, _lint_shell_scripts
+
+
+@pytest.mark.skipif(not shutil.which("hadolint"), reason="hadolint not installed")
+def test_hadolint_error_fails_dockerfile(tmp_path):
+    """A Dockerfile hadolint cannot read must not be reported as passing."""
+    missing = tmp_path / "Dockerfile"
+
+    result = _lint_dockerfiles([missing])[missing]
+
+    assert not result.passed
+    assert "does not exist" in result.message
+
+
+@pytest.mark.skipif(not shutil.which("shellcheck"), reason="shellcheck not installed")
+def test_shellcheck_error_fails_script(tmp_path):
+    """A script shellcheck cannot read must not be reported as passing."""
+    missing = tmp_path / "build.sh"
+
+    result = _lint_shell_scripts([missing], check_formatting=False)[missing]
+
+    assert not result.passed
+    assert "does not exist" in result.message
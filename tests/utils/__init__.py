@@ -1,21 +1,46 @@
 """Test utilities."""
 
+from .cli import run_cm
+from .container import (
+    BUILD_ENV,
+    REGISTRY_ERRORS,
+    build_image,
+    remove_image,
+    run_with_early_skip,
+)
+from .files import file_contains, link_or_copy, reflink_or_copy, write_files
 from .validation import (
     ValidationResult,
     validate_directory,
     validate_dockerfile,
+    validate_dockerfiles,
     validate_file,
     validate_no_consecutive_blank_lines,
     validate_shell_script,
+    validate_shell_scripts,
     validate_yaml,
+    validate_yaml_format,
 )
 
 __all__ = [
+    "BUILD_ENV",
+    "REGISTRY_ERRORS",
     "ValidationResult",
+    "build_image",
+    "file_contains",
+    "link_or_copy",
+    "reflink_or_copy",
+    "remove_image",
+    "run_cm",
+    "run_with_early_skip",
     "validate_directory",
     "validate_dockerfile",
+    "validate_dockerfiles",
     "validate_file",
     "validate_no_consecutive_blank_lines",
     "validate_shell_script",
+    "validate_shell_scripts",
     "validate_yaml",
+    "validate_yaml_format",
+    "write_files",
 ]
@@ -0,0 +1,44 @@
+"""In-process invocation of the cm CLI for tests.
+
+Running ``cm`` through subprocess pays interpreter startup and package import
+on every call. Invoking the Click group directly keeps one interpreter warm.
+Reserve subprocess for the generated shell scripts (build.sh, run.sh).
+"""
+
+import os
+import subprocess
+import traceback
+from pathlib import Path
+from typing import List
+
+from click.testing import CliRunner
+
+from container_magic.cli.main import cli
+
+try:
+    _runner = CliRunner(mix_stderr=False)
+except TypeError:
+    # Click >= 8.2 always captures stderr separately
+    _runner = CliRunner()
+
+
+def run_cm(args: List[str], cwd: Path) -> subprocess.CompletedProcess:
+    """Run ``cm <args>`` in-process with cwd as the working directory.
+
+    Returns a CompletedProcess so call sites can keep asserting on
+    returncode, stdout and stderr as they would for a real subprocess.
+    """
+    previous_cwd = os.getcwd()
+    os.chdir(cwd)
+    try:
+        result = _runner.invoke(cli, args)
+    finally:
+        os.chdir(previous_cwd)
+
+    stderr = result.stderr
+    if result.exception is not None and not isinstance(result.exception, SystemExit):
+        stderr += "".join(traceback.format_exception(*result.exc_info))
+
+    return subprocess.CompletedProcess(
+        ["cm"] + list(args), result.exit_code, result.stdout, stderr
+    )
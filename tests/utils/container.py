@@ -0,0 +1,110 @@
+"""Helpers for tests that build and run container images."""
+
+import os
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pytest
+
+from container_magic.core.config import ContainerMagicConfig
+from container_magic.core.runtime import get_runtime
+
+# Environment for ./build.sh and direct builds. BuildKit reuses unchanged
+# layers more aggressively than the legacy docker builder; podman ignores it.
+BUILD_ENV = {**os.environ, "DOCKER_BUILDKIT": "1"}
+
+# stderr output meaning the registry, not the build, failed
+REGISTRY_ERRORS = (b"manifest unknown", b"toomanyrequests")
+
+
+def run_with_early_skip(
+    cmd: Sequence[str],
+    cwd: Path,
+    skip_markers: Sequence[bytes] = REGISTRY_ERRORS,
+    timeout: int = 300,
+    env: Optional[dict] = None,
+) -> subprocess.CompletedProcess:
+    """Run a build command, skipping the test as soon as the registry fails.
+
+    stderr is read line by line while the command runs. When a line contains
+    one of skip_markers, the command is killed and the calling test skipped
+    instead of waiting for the build to give up. Otherwise returns a
+    CompletedProcess with stderr as bytes; stdout is discarded. env defaults
+    to BUILD_ENV.
+    """
+    lines = []
+    timed_out = threading.Event()
+    with subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=BUILD_ENV if env is None else env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    ) as process:
+
+        def _kill():
+            # Kill the whole group, since build.sh children hold stderr open
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        def _timeout():
+            timed_out.set()
+            _kill()
+
+        timer = threading.Timer(timeout, _timeout)
+        timer.start()
+        try:
+            for line in process.stderr:
+                lines.append(line)
+                if any(marker in line for marker in skip_markers):
+                    _kill()
+                    pytest.skip(
+                        f"registry unavailable: {line.decode(errors='replace').strip()}"
+                    )
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            # Also covers KeyboardInterrupt, which would otherwise orphan the
+            # build's process group
+            if process.poll() is None:
+                _kill()
+
+    stderr = b"".join(lines)
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, returncode, None, stderr)
+
+
+def build_image(
+    project_dir: Path,
+    tag: str = "latest",
+    timeout: int = 300,
+) -> subprocess.CompletedProcess:
+    """Build a generated project's image with its ./build.sh.
+
+    build.sh builds its default_target with the generated build args and
+    stages any workspace symlinks first. It runs with BUILD_ENV, so docker
+    uses BuildKit. Only stderr is captured, as bytes, for failure messages;
+    the build log on stdout is discarded. Registry errors skip the test, as
+    in run_with_early_skip.
+    """
+    return run_with_early_skip(
+        ["./build.sh", "--tag", tag], project_dir, timeout=timeout
+    )
+
+
+def remove_image(project_dir: Path, tag: str = "latest") -> None:
+    """Remove the image built from a generated project, ignoring failures."""
+    config = ContainerMagicConfig.from_yaml(project_dir / "cm.yaml")
+    runtime = get_runtime(config.backend).value
+    subprocess.run(
+        [runtime, "rmi", "-f", f"{config.names.image}:{tag}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
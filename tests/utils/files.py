@@ -0,0 +1,71 @@
+"""File helpers for setting up test projects."""
+
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# ioctl request that makes dst share src's extents (Linux FICLONE)
+_FICLONE = 0x40049409
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Hardlink src to dst, falling back to a copy across filesystems.
+
+    Only use this for files the test never writes to: a write through the
+    link would modify the source fixture as well.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
+
+
+def reflink_or_copy(src: Path, dst: Path) -> None:
+    """Clone src to dst where the filesystem supports it, else copy it.
+
+    On btrfs, XFS and other reflink-capable filesystems the clone shares the
+    source's blocks until either file is written, so it costs only metadata.
+    Unlike link_or_copy, dst is an independent file and safe to modify. Use it
+    as the copy_function of shutil.copytree.
+    """
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            pass
+        else:
+            shutil.copystat(src, dst)
+            return
+    shutil.copy2(src, dst)
+
+
+def write_files(root: Path, files: Dict[str, str]) -> None:
+    """Write a tree of text files under root, given as {relative path: content}.
+
+    Each parent directory is created once, however many files it holds.
+    """
+    for parent in {(root / name).parent for name in files}:
+        parent.mkdir(parents=True, exist_ok=True)
+    for name, content in files.items():
+        (root / name).write_text(content)
+
+
+def file_contains(path: Path, needle: bytes) -> bool:
+    """Return whether the file at path contains needle.
+
+    The file is memory-mapped and searched as bytes, so it is never decoded.
+    Meant for a single check per file: for several, read the file once.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return needle == b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped.find(needle) != -1
@@ -3,10 +3,30 @@
 Provides consistent validation across tests and generators.
 """
 
+import functools
+import hashlib
+import json
 import shutil
 import subprocess
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple, Union
+
+import yaml
+
+HADOLINT_CONFIG = Path(__file__).parent.parent / "fixtures" / "hadolint.yaml"
+
+# Shell script results keyed by (content digest, check_formatting). Generated
+# scripts are often byte-identical across configs, so each is linted once.
+_shell_script_results: Dict[Tuple[str, bool], "ValidationResult"] = {}
+
+# Dockerfile results keyed by content digest, for the same reason.
+_dockerfile_results: Dict[str, "ValidationResult"] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name: str) -> Optional[str]:
+    # Linters don't appear or vanish mid-run, so walk PATH once per tool
+    return shutil.which(name)
 
 
 class ValidationResult:
@@ -23,51 +43,71 @@ class ValidationResult:
         return self.message if self.message else ("PASS" if self.passed else "FAIL")
 
 
+# Whitespace that bytes.strip() removes, other than the newline itself
+_HORIZONTAL_WHITESPACE = b" \t\r\f\v"
+
+
 def validate_no_consecutive_blank_lines(
-    file_path: Path, max_consecutive: int = 1
+    file_path: Union[Path, bytes], max_consecutive: int = 1
 ) -> ValidationResult:
     """
     Validate that file has no more than max_consecutive blank lines.
 
     Args:
-        file_path: Path to file to check
+        file_path: Path to file to check, or the file's contents as bytes
         max_consecutive: Maximum allowed consecutive blank lines (default 1)
 
     Returns:
         ValidationResult indicating success/failure
     """
-    try:
-        with open(file_path) as f:
-            lines = f.readlines()
-    except Exception as e:
-        return ValidationResult(False, f"Failed to read file: {e}")
+    if isinstance(file_path, bytes):
+        data = file_path
+    else:
+        try:
+            data = Path(file_path).read_bytes()
+        except Exception as e:
+            return ValidationResult(False, f"Failed to read file: {e}")
+
+    # With horizontal whitespace removed every blank line is empty, so a run of
+    # too many is a plain substring. The leading newline catches blank lines at
+    # the start of the file.
+    squeezed = b"\n" + data.translate(None, _HORIZONTAL_WHITESPACE)
+    if b"\n" * (max_consecutive + 2) not in squeezed:
+        return ValidationResult(True)
 
     consecutive_blanks = 0
     found_excessive = []
 
-    for i, line in enumerate(lines, start=1):
-        if line.strip() == "":
+    for i, line in enumerate(data.splitlines(), start=1):
+        if line.strip() == b"":
             consecutive_blanks += 1
             if consecutive_blanks > max_consecutive:
                 found_excessive.append(i)
         else:
             consecutive_blanks = 0
 
-    if found_excessive:
-        lines_str = ", ".join(str(line) for line in found_excessive[:5])
-        if len(found_excessive) > 5:
-            lines_str += f" (and {len(found_excessive) - 5} more)"
-        return ValidationResult(
-            False,
-            f"Found {len(found_excessive)} lines with excessive blank lines at: {lines_str}",
-        )
-
-    return ValidationResult(True)
+    lines_str = ", ".join(str(line) for line in found_excessive[:5])
+    if len(found_excessive) > 5:
+        lines_str += f" (and {len(found_excessive) - 5} more)"
+    return ValidationResult(
+        False,
+        f"Found {len(found_excessive)} lines with excessive blank lines at: {lines_str}",
+    )
 
 
 def validate_yaml(yaml_file: Path) -> ValidationResult:
-    """Validate YAML file with yamlfmt."""
-    yamlfmt = shutil.which("yamlfmt")
+    """Validate that a YAML file parses, without spawning a formatter."""
+    try:
+        yaml.safe_load(yaml_file.read_text())
+    except (OSError, yaml.YAMLError) as e:
+        return ValidationResult(False, f"YAML parse failed:\n{e}")
+
+    return ValidationResult(True, "yaml: OK")
+
+
+def validate_yaml_format(yaml_file: Path) -> ValidationResult:
+    """Validate YAML file formatting with yamlfmt."""
+    yamlfmt = _which("yamlfmt")
     if not yamlfmt:
         return ValidationResult(True, "yamlfmt not available (skipped)")
 
@@ -79,7 +119,8 @@ def validate_yaml(yaml_file: Path) -> ValidationResult:
             "-lint",
             str(yaml_file),
         ],
-        capture_output=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
         text=True,
     )
 
@@ -90,71 +131,195 @@ def validate_yaml(yaml_file: Path) -> ValidationResult:
 
 
 def validate_dockerfile(dockerfile: Path) -> ValidationResult:
-    """Validate Dockerfile with hadolint."""
-    hadolint = shutil.which("hadolint")
-    if not hadolint:
-        return ValidationResult(True, "hadolint not available (skipped)")
-
-    hadolint_config = Path(__file__).parent.parent / "fixtures" / "hadolint.yaml"
-    cmd = ["hadolint", "--failure-threshold", "warning"]
-    if hadolint_config.exists():
-        cmd.extend(["--config", str(hadolint_config)])
-    cmd.append(str(dockerfile))
+    """Validate Dockerfile with hadolint.
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    Results are cached by Dockerfile content.
+    """
+    return validate_dockerfiles([dockerfile])[dockerfile]
 
-    if result.returncode != 0:
-        return ValidationResult(
-            False, f"hadolint failed:\n{result.stderr}\n{result.stdout}"
-        )
 
-    return ValidationResult(True, "hadolint: OK")
+def _content_digest(path: Path) -> str:
+    # 128 bits is plenty to tell apart the few hundred files linted per run
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
 
 
 def validate_shell_script(
     script: Path, check_formatting: bool = True
 ) -> ValidationResult:
-    """Validate shell script with shellcheck and optionally shfmt."""
-    messages = []
-    all_passed = True
+    """Validate shell script with shellcheck and optionally shfmt.
+
+    Results are cached by script content.
+    """
+    return validate_shell_scripts([script], check_formatting)[script]
+
+
+def _group_findings(
+    files: List[Path], findings: List[dict], levels=None
+) -> Dict[Path, List[str]]:
+    """Group linter JSON findings by file, keeping only the given levels."""
+    grouped = {path: [] for path in files}
+    by_name = {str(path): path for path in files}
+    for finding in findings:
+        if levels is not None and finding.get("level") not in levels:
+            continue
+        path = by_name.get(finding.get("file"))
+        if path is not None:
+            grouped[path].append(
+                f"{path.name}:{finding.get('line')} {finding.get('code')} "
+                f"{finding.get('level')}: {finding.get('message')}"
+            )
+    return grouped
+
 
-    # Check with shellcheck
-    shellcheck = shutil.which("shellcheck")
-    if not shellcheck:
-        messages.append("shellcheck not available (skipped)")
+def validate_dockerfiles(dockerfiles: List[Path]) -> Dict[Path, ValidationResult]:
+    """Validate several Dockerfiles with a single hadolint invocation.
+
+    Dockerfiles whose content has already been validated are not linted again.
+
+    Returns:
+        Dictionary mapping each Dockerfile to its ValidationResult
+    """
+    keys = {path: _content_digest(path) for path in dockerfiles}
+    pending = {}
+    for path, key in keys.items():
+        if key not in _dockerfile_results and key not in pending:
+            pending[key] = path
+
+    linted = _lint_dockerfiles(list(pending.values()))
+    for key, path in pending.items():
+        _dockerfile_results[key] = linted[path]
+
+    return {path: _dockerfile_results[key] for path, key in keys.items()}
+
+
+def _lint_dockerfiles(dockerfiles: List[Path]) -> Dict[Path, ValidationResult]:
+    if not dockerfiles:
+        return {}
+    if not _which("hadolint"):
+        return {
+            path: ValidationResult(True, "hadolint not available (skipped)")
+            for path in dockerfiles
+        }
+
+    cmd = ["hadolint", "--format", "json", "--no-fail"]
+    if HADOLINT_CONFIG.exists():
+        cmd.extend(["--config", str(HADOLINT_CONFIG)])
+    cmd.extend(str(path) for path in dockerfiles)
+
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        findings = json.loads(result.stdout or "[]")
+    except ValueError:
+        findings = None
+
+    # With --no-fail, findings exit 0; anything else means hadolint itself
+    # failed, e.g. on a missing or unreadable file
+    if findings is None or result.returncode != 0:
+        return {
+            path: ValidationResult(False, f"hadolint failed:\n{result.stderr}")
+            for path in dockerfiles
+        }
+
+    grouped = _group_findings(dockerfiles, findings, levels=("error", "warning"))
+    return {
+        path: ValidationResult(False, "hadolint failed:\n" + "\n".join(issues))
+        if issues
+        else ValidationResult(True, "hadolint: OK")
+        for path, issues in grouped.items()
+    }
+
+
+def validate_shell_scripts(
+    scripts: List[Path], check_formatting: bool = True
+) -> Dict[Path, ValidationResult]:
+    """Validate several shell scripts with one shellcheck and one shfmt call.
+
+    Scripts whose content has already been validated are not linted again.
+
+    Returns:
+        Dictionary mapping each script to its ValidationResult
+    """
+    keys = {path: (_content_digest(path), check_formatting) for path in scripts}
+    pending = {}
+    for path, key in keys.items():
+        if key not in _shell_script_results and key not in pending:
+            pending[key] = path
+
+    linted = _lint_shell_scripts(list(pending.values()), check_formatting)
+    for key, path in pending.items():
+        _shell_script_results[key] = linted[path]
+
+    return {path: _shell_script_results[key] for path, key in keys.items()}
+
+
+def _lint_shell_scripts(
+    scripts: List[Path], check_formatting: bool
+) -> Dict[Path, ValidationResult]:
+    if not scripts:
+        return {}
+    messages = {path: [] for path in scripts}
+    failed = set()
+
+    if not _which("shellcheck"):
+        for path in scripts:
+            messages[path].append("shellcheck not available (skipped)")
     else:
         result = subprocess.run(
-            ["shellcheck", str(script)],
+            ["shellcheck", "--format", "json"] + [str(path) for path in scripts],
             capture_output=True,
             text=True,
         )
-
-        if result.returncode != 0:
-            all_passed = False
-            messages.append(f"shellcheck failed:\n{result.stderr}\n{result.stdout}")
+        try:
+            findings = json.loads(result.stdout or "[]")
+        except ValueError:
+            findings = None
+
+        # shellcheck exits 1 for findings; 2 and above mean it could not
+        # check a file, even though it still prints valid JSON
+        if (
+            findings is None
+            or result.returncode > 1
+            or (result.returncode != 0 and not findings)
+        ):
+            for path in scripts:
+                failed.add(path)
+                messages[path].append(f"shellcheck failed:\n{result.stderr}")
         else:
-            messages.append("shellcheck: OK")
+            for path, issues in _group_findings(scripts, findings).items():
+                if issues:
+                    failed.add(path)
+                    messages[path].append("shellcheck failed:\n" + "\n".join(issues))
+                else:
+                    messages[path].append("shellcheck: OK")
 
-    # Check formatting with shfmt
     if check_formatting:
-        shfmt = shutil.which("shfmt")
-        if not shfmt:
-            messages.append("shfmt not available (skipped)")
+        if not _which("shfmt"):
+            for path in scripts:
+                messages[path].append("shfmt not available (skipped)")
         else:
-            # Run shfmt in diff mode to check if formatting would change
+            # -l lists the files whose formatting would change
             result = subprocess.run(
-                ["shfmt", "-d", str(script)],
+                ["shfmt", "-l"] + [str(path) for path in scripts],
                 capture_output=True,
                 text=True,
             )
-
-            if result.returncode != 0:
-                all_passed = False
-                messages.append(f"shfmt formatting needed:\n{result.stdout}")
-            else:
-                messages.append("shfmt: OK")
-
-    return ValidationResult(all_passed, "\n".join(messages))
+            unformatted = set(result.stdout.split())
+            for path in scripts:
+                if result.stderr:
+                    # shfmt exits 1 for unformatted files too, so an error
+                    # only shows up on stderr
+                    failed.add(path)
+                    messages[path].append(f"shfmt failed:\n{result.stderr}")
+                elif str(path) in unformatted:
+                    failed.add(path)
+                    messages[path].append(f"shfmt formatting needed: {path.name}")
+                else:
+                    messages[path].append("shfmt: OK")
+
+    return {
+        path: ValidationResult(path not in failed, "\n".join(messages[path]))
+        for path in scripts
+    }
 
 
 def validate_file(file_path: Path) -> ValidationResult: